@@ -2,14 +2,107 @@
 """CLI entry point for running commodity alert evaluations."""
 
 import argparse
+import asyncio
 import sys
+from collections.abc import Callable, Iterable
 from datetime import datetime, timezone
 from pathlib import Path
 
 # Add src to path so we can import commodity_eval
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from commodity_eval import Outcome, load_eval_rows, run_analysis, run_judge, save_eval_rows
+from commodity_eval import (
+    AsyncTokenBucket,
+    EvalRow,
+    Outcome,
+    load_eval_rows,
+    run_analysis_batch,
+    run_judge_batch,
+    run_pipeline_async,
+    save_eval_rows_streaming,
+)
+from commodity_eval.analyzer import ANALYZER_MAX_TOKENS
+from commodity_eval.client import close_async_client, get_api_key
+from commodity_eval.judge import JUDGE_MAX_TOKENS
+from commodity_eval.ratelimit import DEFAULT_RPM, DEFAULT_TPM
+from commodity_eval.runner import DEFAULT_CONCURRENCY
+
+
+def positive_int(value: str) -> int:
+    """argparse type for options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def positive_float(value: str) -> float:
+    """argparse type for options that must be greater than 0."""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {number}")
+    return number
+
+
+def print_phase_header(title: str) -> None:
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+async def run_phases(
+    rows: Iterable[EvalRow],
+    args: argparse.Namespace,
+    write: Callable[[EvalRow], None],
+) -> None:
+    """Run the analyzer and judge phases in one event loop, writing each finished row."""
+    use_cache = args.cache
+
+    if args.use_batch:
+        # A batch needs every request up front, so materialize the rows.
+        rows = list(rows)
+        if not args.skip_analysis:
+            if args.verbose:
+                print_phase_header("PHASE 1: Running analyzer")
+            rows = run_analysis_batch(
+                rows,
+                args.analyzer_prompt,
+                args.verbose,
+                use_cache=use_cache,
+                max_tokens=args.analyzer_max_tokens,
+            )
+        if not args.skip_judge:
+            if args.verbose:
+                print_phase_header("PHASE 2: Running judge")
+            rows = run_judge_batch(
+                rows,
+                args.judge_prompt,
+                args.verbose,
+                use_cache=use_cache,
+                max_tokens=args.judge_max_tokens,
+            )
+        for row in rows:
+            write(row)
+        return
+
+    # Each row is judged as soon as its own analysis returns, so the two
+    # phases overlap instead of running back to back.
+    if args.verbose:
+        print_phase_header("Running analyzer and judge")
+    async for row in run_pipeline_async(
+        rows,
+        args.analyzer_prompt,
+        args.judge_prompt,
+        args.concurrency,
+        args.verbose,
+        use_cache=use_cache,
+        analyzer_max_tokens=args.analyzer_max_tokens,
+        judge_max_tokens=args.judge_max_tokens,
+        rate_limiter=AsyncTokenBucket(args.rpm, args.tpm),
+        skip_analysis=args.skip_analysis,
+        skip_judge=args.skip_judge,
+    ):
+        write(row)
 
 
 def main() -> None:
@@ -30,6 +123,18 @@ def main() -> None:
         default="v1",
         help="Judge prompt version (default: v1)",
     )
+    parser.add_argument(
+        "--analyzer-max-tokens",
+        type=positive_int,
+        default=ANALYZER_MAX_TOKENS,
+        help=f"Output token cap per analyzer call (default: {ANALYZER_MAX_TOKENS})",
+    )
+    parser.add_argument(
+        "--judge-max-tokens",
+        type=positive_int,
+        default=JUDGE_MAX_TOKENS,
+        help=f"Output token cap per judge call (default: {JUDGE_MAX_TOKENS})",
+    )
     parser.add_argument(
         "--output-dir",
         type=Path,
@@ -51,56 +156,94 @@ def main() -> None:
         action="store_true",
         help="Skip judge phase, only run analysis",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum concurrent API calls (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--use-batch",
+        action="store_true",
+        help="Submit each phase as one Message Batch (half price, may take minutes)",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=positive_float,
+        default=DEFAULT_RPM,
+        help=f"Client-side requests/minute limit for direct calls (default: {DEFAULT_RPM})",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=positive_float,
+        default=DEFAULT_TPM,
+        help=f"Client-side input tokens/minute limit for direct calls (default: {DEFAULT_TPM})",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse and write the on-disk response cache (.eval_cache/); replays earlier samples",
+    )
 
     args = parser.parse_args()
 
-    # Load golden dataset
-    if args.verbose:
-        print(f"Loading scenarios from {args.csv}")
-    rows = load_eval_rows(args.csv)
-    if args.verbose:
-        print(f"Loaded {len(rows)} scenarios\n")
-
-    # Phase 1: Analysis
-    if not args.skip_analysis:
-        if args.verbose:
-            print("=" * 60)
-            print("PHASE 1: Running analyzer")
-            print("=" * 60)
-        rows = list(run_analysis(rows, args.analyzer_prompt, args.verbose))
-        if args.verbose:
-            print()
-
-    # Phase 2: Judge
-    if not args.skip_judge:
-        if args.verbose:
-            print("=" * 60)
-            print("PHASE 2: Running judge")
-            print("=" * 60)
-        rows = list(run_judge(rows, args.judge_prompt, args.verbose))
-        if args.verbose:
-            print()
-
-    # Save results
+    # Fail before any work (or output file) if the run will need the API.
+    if not (args.skip_analysis and args.skip_judge):
+        try:
+            get_api_key()
+        except ValueError as e:
+            parser.error(str(e))
+
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     output_path = args.output_dir / f"analyzer-{args.analyzer_prompt}_judge-{args.judge_prompt}_{timestamp}.csv"
-    save_eval_rows(rows, output_path)
-    print(f"Results saved to {output_path}")
 
-    # Print summary
-    judged = [r for r in rows if r.model_outcome is not None]
-    passed = [r for r in judged if r.model_outcome == Outcome.PASS]
-    failed = [r for r in judged if r.model_outcome == Outcome.FAIL]
+    # Stream scenarios from the golden dataset through the pipeline, saving
+    # each row in input order as soon as it and every earlier row are done.
+    if args.verbose:
+        print(f"Loading scenarios from {args.csv}\n")
+    # Tally the summary as rows are written so finished rows aren't kept;
+    # only the failed ones are needed for the printout.
+    n_total = n_judged = n_passed = 0
+    failed: list[EvalRow] = []
+    with save_eval_rows_streaming(output_path) as write_row:
+
+        def write(row: EvalRow) -> None:
+            nonlocal n_total, n_judged, n_passed
+            write_row(row)
+            n_total += 1
+            if row.model_outcome is None:
+                return
+            n_judged += 1
+            if row.model_outcome is Outcome.PASS:
+                n_passed += 1
+            else:
+                failed.append(row)
 
+        async def run() -> None:
+            try:
+                await run_phases(load_eval_rows(args.csv), args, write)
+            finally:
+                await close_async_client()
+
+        asyncio.run(run())
+
+    if args.verbose:
+        print()
+    if n_total:
+        print(f"Results saved to {output_path}")
+    else:
+        print(f"No scenarios found in {args.csv}; nothing saved")
+
+    # Print summary
     print("\n" + "=" * 60)
     print("SUMMARY")
     print("=" * 60)
-    print(f"Total scenarios:  {len(rows)}")
-    print(f"Judged:           {len(judged)}")
-    print(f"Passed:           {len(passed)}")
+    print(f"Total scenarios:  {n_total}")
+    print(f"Judged:           {n_judged}")
+    print(f"Passed:           {n_passed}")
     print(f"Failed:           {len(failed)}")
-    if judged:
-        print(f"Pass rate:        {len(passed) / len(judged) * 100:.1f}%")
+    if n_judged:
+        print(f"Pass rate:        {n_passed / n_judged * 100:.1f}%")
 
     if failed:
         print(f"\nFailed scenarios:")
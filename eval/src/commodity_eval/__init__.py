@@ -1,20 +1,49 @@
 """Eval framework for commodity alert LLM suggestions."""
 
-from .models import AlertSuggestion, AnalysisResult, EvalRow, JudgmentResult, Outcome
-from .analyzer import analyze_positions
-from .judge import judge_response
-from .runner import load_eval_rows, run_analysis, run_judge, save_eval_rows
+from .models import (
+    AlertSuggestion,
+    AnalysisResult,
+    EvalRow,
+    InvalidResponseError,
+    JudgmentResult,
+    Outcome,
+)
+from .analyzer import analyze_positions, analyze_positions_async
+from .judge import judge_response, judge_response_async
+from .ratelimit import AsyncTokenBucket
+from .runner import (
+    load_eval_rows,
+    run_analysis,
+    run_analysis_async,
+    run_analysis_batch,
+    run_judge,
+    run_judge_async,
+    run_judge_batch,
+    run_pipeline_async,
+    save_eval_rows,
+    save_eval_rows_streaming,
+)
 
 __all__ = [
     "AlertSuggestion",
     "AnalysisResult",
+    "AsyncTokenBucket",
     "EvalRow",
+    "InvalidResponseError",
     "JudgmentResult",
     "Outcome",
     "analyze_positions",
+    "analyze_positions_async",
     "judge_response",
+    "judge_response_async",
     "load_eval_rows",
     "run_analysis",
+    "run_analysis_async",
+    "run_analysis_batch",
     "run_judge",
+    "run_judge_async",
+    "run_judge_batch",
+    "run_pipeline_async",
     "save_eval_rows",
+    "save_eval_rows_streaming",
 ]
@@ -1,15 +1,22 @@
 """Calls Claude API to analyze commodity positions and suggest alerts."""
 
-import json
-import os
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from anthropic import Anthropic
-from anthropic.types import TextBlock, ToolUseBlock
+from pydantic import ValidationError
 
-from .models import AlertSuggestion, AnalysisResult
+from . import cache, jsonutil
+from .client import get_async_client, get_client
+from .models import AlertSuggestion, AnalysisResult, InvalidResponseError
+from .ratelimit import AsyncTokenBucket, estimate_tokens
+
+if TYPE_CHECKING:
+    from anthropic.types import Message
 
 ANALYZER_MODEL = "claude-sonnet-4-5-20250929"
+# Typical replies (reasoning + 4-5 create_alert calls) run 500-650 output tokens.
+ANALYZER_MAX_TOKENS = 1024
 PROMPTS_DIR = Path(__file__).parent.parent.parent / "analyzer_prompts"
 
 CREATE_ALERT_TOOL = {
@@ -40,7 +47,16 @@ CREATE_ALERT_TOOL = {
     },
 }
 
+# Fixed scaffold of the analyzer user message; only the two JSON payloads vary.
+_USER_PREFIX = "Here are the user's current commodity positions:\n"
+_USER_MID = "\n\nHere are the current market prices:\n"
+_USER_SUFFIX = (
+    "\n\nPlease analyze these positions and suggest appropriate price alerts. "
+    "For each suggestion, use the create_alert tool."
+)
+
 
+@lru_cache(maxsize=None)
 def load_analyzer_prompt(version: str = "v1") -> str:
     """Load the analyzer system prompt."""
     prompt_path = PROMPTS_DIR / f"{version}.txt"
@@ -49,10 +65,82 @@ def load_analyzer_prompt(version: str = "v1") -> str:
     return prompt_path.read_text()
 
 
+@lru_cache(maxsize=None)
+def analyzer_system_blocks(version: str = "v1") -> tuple[dict, ...]:
+    """
+    Return the analyzer system prompt as text blocks, built once per version.
+
+    The block is marked as a cache breakpoint so the tools + system prefix is
+    reused across scenarios instead of re-prefilled on each call.
+    """
+    return (
+        {
+            "type": "text",
+            "text": load_analyzer_prompt(version),
+            "cache_control": {"type": "ephemeral"},
+        },
+    )
+
+
+def build_analyzer_request(
+    positions: list[dict],
+    prices: list[dict],
+    prompt_version: str = "v1",
+    max_tokens: int = ANALYZER_MAX_TOKENS,
+) -> dict:
+    """Build the messages.create keyword arguments for an analyzer call."""
+    user_message = "".join(
+        (
+            _USER_PREFIX,
+            jsonutil.dumps_indented(positions),
+            _USER_MID,
+            jsonutil.dumps_indented(prices),
+            _USER_SUFFIX,
+        )
+    )
+
+    return {
+        "model": ANALYZER_MODEL,
+        "max_tokens": max_tokens,
+        "system": analyzer_system_blocks(prompt_version),
+        "messages": [{"role": "user", "content": user_message}],
+        "tools": [CREATE_ALERT_TOOL],
+    }
+
+
+def parse_analyzer_response(response: "Message") -> AnalysisResult:
+    """Collect reasoning text and create_alert tool calls from an analyzer reply."""
+    if response.stop_reason == "max_tokens":
+        # The last tool call may be cut off mid-input; don't record a partial answer.
+        raise InvalidResponseError(
+            "Analyzer response hit max_tokens before finishing; "
+            "raise the limit with --analyzer-max-tokens"
+        )
+
+    reasoning_parts: list[str] = []
+    suggestions: list[AlertSuggestion] = []
+
+    for block in response.content:
+        if block.type == "text":
+            reasoning_parts.append(block.text)
+        elif block.type == "tool_use" and block.name == "create_alert":
+            try:
+                suggestions.append(AlertSuggestion(**block.input))
+            except ValidationError as e:
+                raise InvalidResponseError(f"Malformed create_alert call: {e}") from e
+
+    return AnalysisResult(
+        reasoning="\n".join(reasoning_parts),
+        suggestions=suggestions,
+    )
+
+
 def analyze_positions(
     positions: list[dict],
     prices: list[dict],
     prompt_version: str = "v1",
+    use_cache: bool = False,
+    max_tokens: int = ANALYZER_MAX_TOKENS,
 ) -> AnalysisResult:
     """
     Call Claude to analyze positions and suggest alerts.
@@ -61,43 +149,43 @@ def analyze_positions(
         positions: List of position dicts with commodity_code, direction, volume, entry_price
         prices: List of price dicts with commodity_code, price
         prompt_version: Version of the analyzer prompt to use
+        use_cache: Reuse a result stored on disk for an identical request
+        max_tokens: Output token cap for the reply
 
     Returns:
         AnalysisResult with reasoning and list of alert suggestions
     """
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY environment variable is required")
+    request = build_analyzer_request(positions, prices, prompt_version, max_tokens)
+    key, cached = cache.lookup(request, use_cache)
+    if cached is not None:
+        return AnalysisResult.model_validate_json(cached)
 
-    client = Anthropic(api_key=api_key)
-    system_prompt = load_analyzer_prompt(prompt_version)
+    client = get_client()
+    response = client.messages.create(**request)
+    result = parse_analyzer_response(response)
 
-    user_message = f"""Here are the user's current commodity positions:
-{json.dumps(positions, indent=2)}
+    cache.store(key, result.model_dump_json())
+    return result
 
-Here are the current market prices:
-{json.dumps(prices, indent=2)}
-
-Please analyze these positions and suggest appropriate price alerts. For each suggestion, use the create_alert tool."""
-
-    response = client.messages.create(
-        model=ANALYZER_MODEL,
-        max_tokens=2048,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_message}],
-        tools=[CREATE_ALERT_TOOL],
-    )
-
-    reasoning_parts: list[str] = []
-    suggestions: list[AlertSuggestion] = []
 
-    for block in response.content:
-        if isinstance(block, TextBlock):
-            reasoning_parts.append(block.text)
-        elif isinstance(block, ToolUseBlock) and block.name == "create_alert":
-            suggestions.append(AlertSuggestion(**block.input))
-
-    return AnalysisResult(
-        reasoning="\n".join(reasoning_parts),
-        suggestions=suggestions,
-    )
+async def analyze_positions_async(
+    positions: list[dict],
+    prices: list[dict],
+    prompt_version: str = "v1",
+    use_cache: bool = False,
+    rate_limiter: AsyncTokenBucket | None = None,
+    max_tokens: int = ANALYZER_MAX_TOKENS,
+) -> AnalysisResult:
+    """Async variant of analyze_positions using the shared AsyncAnthropic client."""
+    request = build_analyzer_request(positions, prices, prompt_version, max_tokens)
+    key, cached = cache.lookup(request, use_cache)
+    if cached is not None:
+        return AnalysisResult.model_validate_json(cached)
+
+    if rate_limiter is not None:
+        await rate_limiter.acquire(estimate_tokens(request))
+    response = await get_async_client().messages.create(**request)
+    result = parse_analyzer_response(response)
+
+    cache.store(key, result.model_dump_json())
+    return result
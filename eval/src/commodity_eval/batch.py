@@ -0,0 +1,70 @@
+"""Submits Claude requests through the Message Batches API."""
+
+import re
+import time
+from typing import TYPE_CHECKING
+
+from .client import get_client
+
+if TYPE_CHECKING:
+    from anthropic.types import Message
+    from anthropic.types.messages.batch_create_params import Request
+
+POLL_INITIAL_DELAY = 5.0
+POLL_MAX_DELAY = 60.0
+
+# The Batches API rejects the whole submission if any custom_id breaks this.
+CUSTOM_ID_PATTERN = re.compile(r"[a-zA-Z0-9_-]{1,64}")
+
+
+def submit_batch(
+    requests: "list[Request]", verbose: bool = False
+) -> "dict[str, Message]":
+    """
+    Submit requests as one Message Batch and block until it has ended.
+
+    Batched requests are billed at half the synchronous price but may take
+    minutes to complete, so this is only suitable for non-interactive runs.
+
+    Args:
+        requests: Batch entries, each with a unique custom_id and messages.create params
+        verbose: Print batch status while polling
+
+    Returns:
+        Mapping of custom_id to Message for every request that succeeded.
+        Errored, canceled and expired requests are reported and left out.
+    """
+    custom_ids = [request["custom_id"] for request in requests]
+    if len(set(custom_ids)) != len(custom_ids):
+        raise ValueError("Batch custom_ids must be unique")
+    invalid = [c for c in custom_ids if not CUSTOM_ID_PATTERN.fullmatch(c)]
+    if invalid:
+        raise ValueError(
+            "Batch custom_ids must be 1-64 letters, digits, '_' or '-': "
+            + ", ".join(repr(c) for c in invalid)
+        )
+
+    client = get_client()
+    batch = client.messages.batches.create(requests=requests)
+    if verbose:
+        print(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+    delay = POLL_INITIAL_DELAY
+    while batch.processing_status != "ended":
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_DELAY)
+        batch = client.messages.batches.retrieve(batch.id)
+        if verbose:
+            counts = batch.request_counts
+            print(
+                f"  batch {batch.id}: {batch.processing_status} "
+                f"({counts.succeeded} succeeded, {counts.processing} processing)"
+            )
+
+    messages: "dict[str, Message]" = {}
+    for entry in client.messages.batches.results(batch.id):
+        if entry.result.type == "succeeded":
+            messages[entry.custom_id] = entry.result.message
+        else:
+            print(f"  [{entry.custom_id}] batch request {entry.result.type}")
+    return messages
@@ -0,0 +1,57 @@
+"""Content-addressed on-disk cache for analyzer and judge results."""
+
+import hashlib
+import json
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).parent.parent.parent / ".eval_cache"
+
+
+def make_key(request: dict) -> str:
+    """
+    Hash the full messages.create request into a cache key.
+
+    The request already carries the model, max_tokens, rendered system prompt,
+    tools and user message, so editing a prompt file or any input changes the key.
+    """
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key: str) -> str | None:
+    """Return the cached value for key, or None on a miss."""
+    try:
+        return _entry_path(key).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def put(key: str, value: str) -> None:
+    """Store value under key, replacing any existing entry atomically."""
+    path = _entry_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(value, encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def lookup(request: dict, use_cache: bool) -> tuple[str | None, str | None]:
+    """
+    Return (key, cached value) for a request; the value is None on a miss.
+
+    With use_cache off this returns (None, None) without hashing the request.
+    """
+    if not use_cache:
+        return None, None
+    key = make_key(request)
+    return key, get(key)
+
+
+def store(key: str | None, value: str) -> None:
+    """Store value under a key from lookup; a None key (cache off) is a no-op."""
+    if key is not None:
+        put(key, value)
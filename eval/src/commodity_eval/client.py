@@ -0,0 +1,76 @@
+"""Shared Anthropic API clients for the analyzer and judge."""
+
+import importlib.util
+import os
+from typing import TYPE_CHECKING
+
+# anthropic is imported on first client creation rather than at module load:
+# it is a heavy import and runs that never call the API don't need it.
+if TYPE_CHECKING:
+    from anthropic import Anthropic, AsyncAnthropic
+
+_client: "Anthropic | None" = None
+_async_client: "AsyncAnthropic | None" = None
+
+# Connection pool cap for the async client; it does not track --concurrency.
+# Over HTTP/1.1, calls beyond this many in flight wait for a free connection.
+ASYNC_MAX_CONNECTIONS = 64
+
+
+def get_api_key() -> str:
+    """Read the Anthropic API key from the environment."""
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY environment variable is required")
+    return api_key
+
+
+def get_client() -> "Anthropic":
+    """
+    Return the process-wide client, creating it on first use.
+
+    Sharing one client keeps a single connection pool, so keep-alive
+    connections and TLS sessions are reused across every call in a run.
+    """
+    global _client
+    if _client is None:
+        from anthropic import Anthropic
+
+        _client = Anthropic(api_key=get_api_key())
+    return _client
+
+
+def get_async_client() -> "AsyncAnthropic":
+    """
+    Return the process-wide async client, creating it on first use.
+
+    Analyzer and judge calls share its httpx pool. When the h2 package is
+    installed the pool speaks HTTP/2, so concurrent calls are multiplexed
+    over one connection instead of opening one connection each.
+    """
+    global _async_client
+    if _async_client is None:
+        import httpx
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+        http_client = DefaultAsyncHttpxClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_CONNECTIONS,
+            ),
+        )
+        _async_client = AsyncAnthropic(api_key=get_api_key(), http_client=http_client)
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """
+    Close the async client's connections, if one was created.
+
+    Call this before the event loop that used the client shuts down.
+    """
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -0,0 +1,25 @@
+"""JSON encode/decode helpers backed by orjson when it is installed."""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+
+    def dumps_indented(obj: Any) -> str:
+        """Serialize obj as JSON indented by two spaces."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+    loads = orjson.loads
+
+else:
+
+    def dumps_indented(obj: Any) -> str:
+        """Serialize obj as JSON indented by two spaces."""
+        return json.dumps(obj, indent=2)
+
+    loads = json.loads
@@ -1,17 +1,42 @@
 """LLM judge implementation for evaluating commodity alert suggestions."""
 
-import json
-import os
+from functools import lru_cache
 from pathlib import Path
-from typing import TypedDict, cast
+from typing import TYPE_CHECKING, TypedDict, cast
 
-from anthropic import Anthropic
-from anthropic.types import TextBlock
+from . import cache
+from .client import get_async_client, get_client
+from .models import AnalysisResult, InvalidResponseError, JudgmentResult, Outcome
+from .ratelimit import AsyncTokenBucket, estimate_tokens
 
-from .models import JudgmentResult, Outcome
+if TYPE_CHECKING:
+    from anthropic.types import Message
 
 JUDGE_MODEL = "claude-sonnet-4-5-20250929"
 JUDGE_PROMPTS_DIR = Path(__file__).parent.parent.parent / "judge_prompts"
+# Verdicts are a single submit_judgment call; the rubric asks for a detailed
+# critique, so leave plenty of room above the typical length.
+JUDGE_MAX_TOKENS = 1024
+
+SUBMIT_JUDGMENT_TOOL = {
+    "name": "submit_judgment",
+    "description": "Submit the pass/fail verdict for the model's alert suggestions",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "critique": {
+                "type": "string",
+                "description": "Explanation of which checks passed or failed and why",
+            },
+            "outcome": {
+                "type": "string",
+                "enum": ["pass", "fail"],
+                "description": "Binary verdict for the scenario",
+            },
+        },
+        "required": ["critique", "outcome"],
+    },
+}
 
 
 class JudgeResultDict(TypedDict):
@@ -19,6 +44,7 @@ class JudgeResultDict(TypedDict):
     outcome: str
 
 
+@lru_cache(maxsize=None)
 def load_judge_prompt(version: str = "v1") -> str:
     """Load the judge prompt from the judge_prompts directory."""
     prompt_path = JUDGE_PROMPTS_DIR / f"{version}.txt"
@@ -27,33 +53,58 @@ def load_judge_prompt(version: str = "v1") -> str:
     return prompt_path.read_text()
 
 
-def judge_response(
+@lru_cache(maxsize=None)
+def judge_system_blocks(version: str = "v1") -> tuple[dict, ...]:
+    """
+    Return the judge rubric as text blocks, built once per version.
+
+    The rubric is identical for every scenario, so it is marked for caching.
+    """
+    return (
+        {
+            "type": "text",
+            "text": load_judge_prompt(version),
+            "cache_control": {"type": "ephemeral"},
+        },
+    )
+
+
+def format_analysis(result: AnalysisResult) -> str:
+    """
+    Render an analyzer result as reasoning text plus one bullet per suggestion.
+
+    This carries the same facts as the JSON dump in far fewer input tokens.
+    """
+    suggestions = "\n".join(
+        f"- {s.commodity_code} {s.condition} {s.threshold_price}: {s.notes}"
+        for s in result.suggestions
+    )
+    return "".join(
+        (
+            "Reasoning:\n",
+            result.reasoning,
+            "\n\nSuggestions (commodity condition threshold_price: notes):\n",
+            suggestions or "(none)",
+        )
+    )
+
+
+def build_judge_request(
     scenario_description: str,
     eval_type: str,
     ground_truth: str,
-    model_response: str,
+    model_response: str | AnalysisResult,
     judge_prompt_version: str = "v1",
-) -> JudgmentResult:
+    max_tokens: int = JUDGE_MAX_TOKENS,
+) -> dict:
     """
-    Judge whether alert suggestions are appropriate for the given scenario.
-
-    Args:
-        scenario_description: Human-readable description of the test scenario
-        eval_type: "strict" or "criteria"
-        ground_truth: JSON (strict) or pipe-delimited rules (criteria)
-        model_response: JSON string of AnalysisResult
-        judge_prompt_version: Version of the judge prompt to use
+    Build the messages.create keyword arguments for a judge call.
 
-    Returns:
-        JudgmentResult with critique and binary pass/fail outcome
+    An in-memory AnalysisResult is sent in the compact format_analysis form;
+    a string (e.g. a model_response resumed from CSV) is sent as-is.
     """
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY environment variable is required")
-
-    client = Anthropic(api_key=api_key)
-    system_prompt = load_judge_prompt(judge_prompt_version)
-
+    if isinstance(model_response, AnalysisResult):
+        model_response = format_analysis(model_response)
     user_message = f"""## Scenario
 {scenario_description}
 
@@ -68,42 +119,116 @@ def judge_response(
 
 Please evaluate this response and provide your judgment."""
 
-    response = client.messages.create(
-        model=JUDGE_MODEL,
-        max_tokens=1024,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_message}],
-    )
+    return {
+        "model": JUDGE_MODEL,
+        "max_tokens": max_tokens,
+        "system": judge_system_blocks(judge_prompt_version),
+        "messages": [{"role": "user", "content": user_message}],
+        "tools": [SUBMIT_JUDGMENT_TOOL],
+        "tool_choice": {"type": "tool", "name": "submit_judgment"},
+    }
+
+
+def parse_judge_response(response: "Message") -> JudgmentResult:
+    """Read the verdict from the judge's submit_judgment tool call."""
+    if response.stop_reason == "max_tokens":
+        raise InvalidResponseError(
+            "Judge response hit max_tokens before finishing its verdict; "
+            "raise the limit with --judge-max-tokens"
+        )
 
-    text_block = next(
-        (block for block in response.content if isinstance(block, TextBlock)), None
+    tool_block = next(
+        (
+            block
+            for block in response.content
+            if block.type == "tool_use" and block.name == "submit_judgment"
+        ),
+        None,
     )
-    if text_block is None:
-        raise ValueError("No text block found in judge response")
-    response_text = text_block.text
+    if tool_block is None:
+        raise InvalidResponseError("No submit_judgment tool call found in judge response")
+    result = cast(JudgeResultDict, tool_block.input)
 
     try:
-        json_start = response_text.find("{")
-        json_end = response_text.rfind("}") + 1
-        if json_start != -1 and json_end > json_start:
-            json_str = response_text[json_start:json_end]
-            result = cast(JudgeResultDict, json.loads(json_str))
-            return JudgmentResult(
-                critique=result["critique"],
-                outcome=Outcome(result["outcome"].lower()),
-            )
-        else:
-            raise ValueError("No JSON found in judge response")
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        response_lower = response_text.lower()
-        if "pass" in response_lower and "fail" not in response_lower:
-            outcome = Outcome.PASS
-        elif "fail" in response_lower:
-            outcome = Outcome.FAIL
-        else:
-            outcome = Outcome.FAIL
-
         return JudgmentResult(
-            critique=f"[Parse error: {e}] {response_text}",
-            outcome=outcome,
+            critique=result["critique"],
+            outcome=Outcome(result["outcome"].lower()),
         )
+    except (AttributeError, KeyError, ValueError) as e:
+        raise InvalidResponseError(f"Malformed submit_judgment call: {e!r}") from e
+
+
+def judge_response(
+    scenario_description: str,
+    eval_type: str,
+    ground_truth: str,
+    model_response: str | AnalysisResult,
+    judge_prompt_version: str = "v1",
+    use_cache: bool = False,
+    max_tokens: int = JUDGE_MAX_TOKENS,
+) -> JudgmentResult:
+    """
+    Judge whether alert suggestions are appropriate for the given scenario.
+
+    Args:
+        scenario_description: Human-readable description of the test scenario
+        eval_type: "strict" or "criteria"
+        ground_truth: JSON (strict) or pipe-delimited rules (criteria)
+        model_response: AnalysisResult, or its JSON string when resuming from CSV
+        judge_prompt_version: Version of the judge prompt to use
+        use_cache: Reuse a judgment stored on disk for an identical request
+        max_tokens: Output token cap for the verdict
+
+    Returns:
+        JudgmentResult with critique and binary pass/fail outcome
+    """
+    request = build_judge_request(
+        scenario_description,
+        eval_type,
+        ground_truth,
+        model_response,
+        judge_prompt_version,
+        max_tokens,
+    )
+    key, cached = cache.lookup(request, use_cache)
+    if cached is not None:
+        return JudgmentResult.model_validate_json(cached)
+
+    client = get_client()
+    response = client.messages.create(**request)
+    judgment = parse_judge_response(response)
+
+    cache.store(key, judgment.model_dump_json())
+    return judgment
+
+
+async def judge_response_async(
+    scenario_description: str,
+    eval_type: str,
+    ground_truth: str,
+    model_response: str | AnalysisResult,
+    judge_prompt_version: str = "v1",
+    use_cache: bool = False,
+    rate_limiter: AsyncTokenBucket | None = None,
+    max_tokens: int = JUDGE_MAX_TOKENS,
+) -> JudgmentResult:
+    """Async variant of judge_response using the shared AsyncAnthropic client."""
+    request = build_judge_request(
+        scenario_description,
+        eval_type,
+        ground_truth,
+        model_response,
+        judge_prompt_version,
+        max_tokens,
+    )
+    key, cached = cache.lookup(request, use_cache)
+    if cached is not None:
+        return JudgmentResult.model_validate_json(cached)
+
+    if rate_limiter is not None:
+        await rate_limiter.acquire(estimate_tokens(request))
+    response = await get_async_client().messages.create(**request)
+    judgment = parse_judge_response(response)
+
+    cache.store(key, judgment.model_dump_json())
+    return judgment
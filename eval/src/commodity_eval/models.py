@@ -1,10 +1,15 @@
 """Data models for the commodity alert evaluation system."""
 
+from collections.abc import Sequence
 from enum import Enum
 
 from pydantic import BaseModel
 
 
+class InvalidResponseError(ValueError):
+    """A Claude reply that can't be turned into a result, e.g. one cut off at max_tokens."""
+
+
 class Outcome(str, Enum):
     """Binary pass/fail judgment outcome."""
 
@@ -35,8 +40,28 @@ class JudgmentResult(BaseModel):
     outcome: Outcome
 
 
+CSV_FIELDNAMES = [
+    "Scenario ID",
+    "Description",
+    "User Name",
+    "Positions JSON",
+    "Prices JSON",
+    "Eval Type",
+    "Ground Truth",
+    "Model Response",
+    "Model Critique",
+    "Model Outcome",
+    "Human Critique",
+    "Human Outcome",
+]
+
+
 class EvalRow(BaseModel):
-    """One row from the golden CSV evaluation dataset."""
+    """
+    One row from the golden CSV evaluation dataset.
+
+    Used as a mutable work item: each phase assigns its output fields in place.
+    """
 
     scenario_id: str
     description: str
@@ -53,43 +78,58 @@ class EvalRow(BaseModel):
 
     @classmethod
     def from_csv_row(cls, row: dict[str, str]) -> "EvalRow":
-        """Create an EvalRow from a CSV row dictionary."""
+        """Create an EvalRow from a CSV row dictionary; missing columns are empty."""
+        return cls.from_csv_values([row.get(name) or "" for name in CSV_FIELDNAMES])
+
+    @classmethod
+    def from_csv_values(cls, values: Sequence[str]) -> "EvalRow":
+        """Create an EvalRow from CSV values given in CSV_FIELDNAMES order."""
+        (
+            scenario_id,
+            description,
+            user_name,
+            positions_json,
+            prices_json,
+            eval_type,
+            ground_truth,
+            model_response,
+            model_critique,
+            model_outcome,
+            human_critique,
+            human_outcome,
+        ) = values
         return cls(
-            scenario_id=row.get("Scenario ID", ""),
-            description=row.get("Description", ""),
-            user_name=row.get("User Name", ""),
-            positions_json=row.get("Positions JSON", ""),
-            prices_json=row.get("Prices JSON", ""),
-            eval_type=row.get("Eval Type", ""),
-            ground_truth=row.get("Ground Truth", ""),
-            model_response=row.get("Model Response") or None,
-            model_critique=row.get("Model Critique") or None,
-            model_outcome=(
-                Outcome(row["Model Outcome"].lower())
-                if row.get("Model Outcome")
-                else None
-            ),
-            human_critique=row.get("Human Critique") or None,
-            human_outcome=(
-                Outcome(row["Human Outcome"].lower())
-                if row.get("Human Outcome")
-                else None
-            ),
+            scenario_id=scenario_id,
+            description=description,
+            user_name=user_name,
+            positions_json=positions_json,
+            prices_json=prices_json,
+            eval_type=eval_type,
+            ground_truth=ground_truth,
+            model_response=model_response or None,
+            model_critique=model_critique or None,
+            model_outcome=Outcome(model_outcome.lower()) if model_outcome else None,
+            human_critique=human_critique or None,
+            human_outcome=Outcome(human_outcome.lower()) if human_outcome else None,
         )
 
     def to_csv_row(self) -> dict[str, str]:
         """Convert to a CSV row dictionary."""
-        return {
-            "Scenario ID": self.scenario_id,
-            "Description": self.description,
-            "User Name": self.user_name,
-            "Positions JSON": self.positions_json,
-            "Prices JSON": self.prices_json,
-            "Eval Type": self.eval_type,
-            "Ground Truth": self.ground_truth,
-            "Model Response": self.model_response or "",
-            "Model Critique": self.model_critique or "",
-            "Model Outcome": self.model_outcome.value if self.model_outcome else "",
-            "Human Critique": self.human_critique or "",
-            "Human Outcome": self.human_outcome.value if self.human_outcome else "",
-        }
+        return dict(zip(CSV_FIELDNAMES, self.to_csv_values()))
+
+    def to_csv_values(self) -> tuple[str, ...]:
+        """Convert to a tuple of CSV values in CSV_FIELDNAMES order."""
+        return (
+            self.scenario_id,
+            self.description,
+            self.user_name,
+            self.positions_json,
+            self.prices_json,
+            self.eval_type,
+            self.ground_truth,
+            self.model_response or "",
+            self.model_critique or "",
+            self.model_outcome.value if self.model_outcome else "",
+            self.human_critique or "",
+            self.human_outcome.value if self.human_outcome else "",
+        )
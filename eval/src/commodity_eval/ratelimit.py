@@ -0,0 +1,66 @@
+"""Proactive client-side rate limiting for concurrent Claude API calls."""
+
+import asyncio
+import json
+import time
+
+# 80% of the tier 1 Sonnet limits (50 requests/min, 30k input tokens/min),
+# leaving headroom for other clients sharing the same API key.
+DEFAULT_RPM = 40
+DEFAULT_TPM = 24_000
+
+
+def estimate_tokens(request: dict) -> int:
+    """Estimate input tokens for a messages.create request at ~4 characters per token."""
+    chars = sum(
+        len(json.dumps(request[field]))
+        for field in ("system", "messages", "tools")
+        if field in request
+    )
+    return chars // 4 + 1
+
+
+class AsyncTokenBucket:
+    """
+    Gate API calls on both requests per minute and input tokens per minute.
+
+    Each budget refills continuously at its per-minute rate, capped at one
+    minute's worth. acquire() waits until both budgets cover the next call,
+    so concurrent workers pace themselves below the server's limits instead
+    of tripping 429s and sleeping through SDK retry backoff.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM) -> None:
+        if rpm <= 0 or tpm <= 0:
+            raise ValueError(f"rpm and tpm must be greater than 0, got {rpm} and {tpm}")
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and `tokens` input tokens are available, then take them."""
+        # A single request larger than the whole bucket could otherwise never run.
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep(
+                    max(
+                        (1 - self._requests) * 60 / self.rpm,
+                        (tokens - self._tokens) * 60 / self.tpm,
+                    )
+                )
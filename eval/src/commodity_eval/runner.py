@@ -1,66 +1,197 @@
 """Orchestrates the evaluation pipeline."""
 
+import asyncio
 import csv
-import json
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
-from .analyzer import analyze_positions
-from .judge import judge_response
-from .models import EvalRow
+from . import cache, jsonutil
+from .analyzer import (
+    ANALYZER_MAX_TOKENS,
+    analyze_positions,
+    analyze_positions_async,
+    build_analyzer_request,
+    parse_analyzer_response,
+)
+from .batch import submit_batch
+from .judge import (
+    JUDGE_MAX_TOKENS,
+    build_judge_request,
+    judge_response,
+    judge_response_async,
+    parse_judge_response,
+)
+from .models import (
+    CSV_FIELDNAMES,
+    AnalysisResult,
+    EvalRow,
+    InvalidResponseError,
+    JudgmentResult,
+)
+from .ratelimit import AsyncTokenBucket
 
+DEFAULT_CONCURRENCY = 8
+# How far past the oldest unfinished row (in multiples of concurrency) the
+# async runners may start new rows while they hold results back for ordering.
+REORDER_WINDOW = 4
 
-def load_eval_rows(csv_path: Path) -> list[EvalRow]:
-    """Load evaluation rows from a CSV file."""
-    rows = []
+# Scenario columns every input CSV must have; result columns may be absent.
+REQUIRED_FIELDNAMES = CSV_FIELDNAMES[:7]
+
+
+def load_eval_rows(csv_path: Path) -> Iterator[EvalRow]:
+    """Lazily load evaluation rows from a CSV file, one row at a time."""
+    # Parsing stays a single sequential pass: quoted Model Response / Critique
+    # fields span lines, so the file can't be split on newline offsets, and
+    # csv.reader holds the GIL, so parallel threads would not speed it up.
+    width = len(CSV_FIELDNAMES)
     with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            rows.append(EvalRow.from_csv_row(row))
-    return rows
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        missing = [name for name in REQUIRED_FIELDNAMES if name not in header]
+        if missing:
+            raise ValueError(
+                f"{csv_path} is missing required columns: {', '.join(missing)}"
+            )
 
+        # Where each expected column sits in this file; None if it is missing.
+        column_index = [
+            header.index(name) if name in header else None for name in CSV_FIELDNAMES
+        ]
+        in_order = header[:width] == CSV_FIELDNAMES
 
-def save_eval_rows(rows: list[EvalRow], csv_path: Path) -> None:
-    """Save evaluation rows to a CSV file."""
-    if not rows:
-        return
+        for values in reader:
+            if not values:
+                continue
+            if in_order:
+                if len(values) < width:
+                    values += [""] * (width - len(values))
+                fields = values[:width]
+            else:
+                fields = [
+                    values[i] if i is not None and i < len(values) else ""
+                    for i in column_index
+                ]
+            yield EvalRow.from_csv_values(fields)
 
-    fieldnames = [
-        "Scenario ID",
-        "Description",
-        "User Name",
-        "Positions JSON",
-        "Prices JSON",
-        "Eval Type",
-        "Ground Truth",
-        "Model Response",
-        "Model Critique",
-        "Model Outcome",
-        "Human Critique",
-        "Human Outcome",
-    ]
+
+def save_eval_rows(rows: Iterable[EvalRow], csv_path: Path) -> None:
+    """Save evaluation rows to a CSV file; nothing is written if there are none."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
 
     csv_path.parent.mkdir(parents=True, exist_ok=True)
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row.to_csv_row())
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDNAMES)
+        writer.writerow(first.to_csv_values())
+        writer.writerows(row.to_csv_values() for row in rows)
+
+
+@contextmanager
+def save_eval_rows_streaming(csv_path: Path) -> Iterator[Callable[[EvalRow], None]]:
+    """
+    Yield a write(row) callable that saves rows to a results CSV incrementally.
+
+    The file is only created on the first write, so a run that fails before
+    producing any row (e.g. a missing input CSV) leaves nothing behind. Each
+    row is flushed as soon as it is written, so a crash mid-run keeps every
+    result that had already come back.
+    """
+    f = None
+    writer = None
+
+    def write(row: EvalRow) -> None:
+        nonlocal f, writer
+        if writer is None:
+            csv_path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(csv_path, "w", newline="", encoding="utf-8")
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDNAMES)
+        writer.writerow(row.to_csv_values())
+        f.flush()
+
+    try:
+        yield write
+    finally:
+        if f is not None:
+            f.close()
+
+
+async def _in_input_order(
+    rows: Iterable[EvalRow],
+    process: Callable[[EvalRow], Awaitable[EvalRow]],
+    concurrency: int,
+) -> AsyncIterator[EvalRow]:
+    """
+    Run process over rows with at most `concurrency` in flight, yielding in input order.
+
+    Rows that finish early wait in a reorder buffer until every earlier row
+    has been yielded, so results come out in the same order as the input. A
+    row is only started while it is within REORDER_WINDOW * concurrency of
+    the oldest unfinished row, so one slow call cannot make the buffer grow
+    without bound, and a lazily loaded dataset is never held in memory.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+    pending_rows = iter(rows)
+    window = REORDER_WINDOW * concurrency
+    in_flight: dict[asyncio.Task[EvalRow], int] = {}
+    finished: dict[int, EvalRow] = {}
+    next_start = 0  # input index of the next row to start
+    next_yield = 0  # input index of the next row to yield
+    exhausted = False
+
+    def fill() -> None:
+        nonlocal next_start, exhausted
+        while (
+            not exhausted
+            and len(in_flight) < concurrency
+            and next_start - next_yield < window
+        ):
+            row = next(pending_rows, None)
+            if row is None:
+                exhausted = True
+                return
+            in_flight[asyncio.create_task(process(row))] = next_start
+            next_start += 1
+
+    fill()
+    try:
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                finished[in_flight.pop(task)] = task.result()
+            while next_yield in finished:
+                row = finished.pop(next_yield)
+                next_yield += 1
+                yield row
+            fill()
+    finally:
+        for task in in_flight:
+            task.cancel()
 
 
 def run_analysis(
-    rows: list[EvalRow],
+    rows: Iterable[EvalRow],
     prompt_version: str = "v1",
     verbose: bool = False,
+    use_cache: bool = False,
+    max_tokens: int = ANALYZER_MAX_TOKENS,
 ) -> Iterator[EvalRow]:
     """
-    Phase 1: Call Claude analyzer for each scenario, populate model_response.
+    Phase 1: Call Claude analyzer for each scenario, populate model_response in place.
 
     Skips rows that already have a model_response.
     """
-    for i, row in enumerate(rows):
+    for i, row in enumerate(rows, 1):
         if verbose:
-            print(f"[{i + 1}/{len(rows)}] Analyzing: {row.description[:60]}...")
+            print(f"[{i}] Analyzing: {row.description[:60]}...")
 
         if row.model_response:
             if verbose:
@@ -68,30 +199,41 @@ def run_analysis(
             yield row
             continue
 
-        positions = json.loads(row.positions_json)
-        prices = json.loads(row.prices_json)
+        positions = jsonutil.loads(row.positions_json)
+        prices = jsonutil.loads(row.prices_json)
 
-        result = analyze_positions(positions, prices, prompt_version)
+        try:
+            result = analyze_positions(
+                positions, prices, prompt_version, use_cache, max_tokens=max_tokens
+            )
+        except InvalidResponseError as e:
+            print(f"[{row.scenario_id}] analyzer reply rejected: {e}")
+            yield row
+            continue
 
         if verbose:
             print(f"  -> {len(result.suggestions)} suggestions generated")
 
-        yield row.model_copy(update={"model_response": result.model_dump_json()})
+        row.model_response = result.model_dump_json()
+        yield row
 
 
 def run_judge(
-    rows: list[EvalRow],
+    rows: Iterable[EvalRow],
     judge_prompt_version: str = "v1",
     verbose: bool = False,
+    use_cache: bool = False,
+    max_tokens: int = JUDGE_MAX_TOKENS,
 ) -> Iterator[EvalRow]:
     """
-    Phase 2: Call Claude judge for each scenario, populate model_critique + model_outcome.
+    Phase 2: Call Claude judge for each scenario, populate model_critique + model_outcome
+    in place.
 
     Skips rows that already have a model_outcome or have no model_response.
     """
-    for i, row in enumerate(rows):
+    for i, row in enumerate(rows, 1):
         if verbose:
-            print(f"[{i + 1}/{len(rows)}] Judging: {row.description[:60]}...")
+            print(f"[{i}] Judging: {row.description[:60]}...")
 
         if not row.model_response:
             if verbose:
@@ -105,20 +247,332 @@ def run_judge(
             yield row
             continue
 
-        judgment = judge_response(
+        try:
+            judgment = judge_response(
+                scenario_description=row.description,
+                eval_type=row.eval_type,
+                ground_truth=row.ground_truth,
+                model_response=row.model_response,
+                judge_prompt_version=judge_prompt_version,
+                use_cache=use_cache,
+                max_tokens=max_tokens,
+            )
+        except InvalidResponseError as e:
+            print(f"[{row.scenario_id}] judge reply rejected: {e}")
+            yield row
+            continue
+
+        if verbose:
+            print(f"  -> {judgment.outcome.value}")
+
+        row.model_critique = judgment.critique
+        row.model_outcome = judgment.outcome
+        yield row
+
+
+async def _analyze_row(
+    row: EvalRow,
+    prompt_version: str,
+    verbose: bool,
+    use_cache: bool,
+    max_tokens: int,
+    rate_limiter: AsyncTokenBucket | None,
+) -> AnalysisResult | None:
+    """
+    Run the analyzer on one row unless it already has a model_response.
+
+    Returns the fresh result, or None if the row was skipped or its reply
+    was rejected.
+    """
+    if row.model_response:
+        if verbose:
+            print(f"[{row.scenario_id}] (skipping - already has response)")
+        return None
+
+    positions = jsonutil.loads(row.positions_json)
+    prices = jsonutil.loads(row.prices_json)
+
+    try:
+        result = await analyze_positions_async(
+            positions, prices, prompt_version, use_cache, rate_limiter, max_tokens
+        )
+    except InvalidResponseError as e:
+        # Left without a model_response: the judge skips it, a resumed run retries.
+        print(f"[{row.scenario_id}] analyzer reply rejected: {e}")
+        return None
+
+    if verbose:
+        print(f"[{row.scenario_id}] {row.description[:60]}...")
+        print(f"  -> {len(result.suggestions)} suggestions generated")
+
+    row.model_response = result.model_dump_json()
+    return result
+
+
+async def _judge_row(
+    row: EvalRow,
+    judge_prompt_version: str,
+    verbose: bool,
+    use_cache: bool,
+    max_tokens: int,
+    rate_limiter: AsyncTokenBucket | None,
+    analysis: AnalysisResult | None = None,
+) -> EvalRow:
+    """
+    Run the judge on one row unless it is unanswered or already judged.
+
+    `analysis` is the row's in-memory analyzer result when it was produced in
+    this run; the judge then gets it in compact form instead of the JSON dump.
+    """
+    if not row.model_response:
+        if verbose:
+            print(f"[{row.scenario_id}] (skipping - no model response)")
+        return row
+
+    if row.model_outcome is not None:
+        if verbose:
+            print(f"[{row.scenario_id}] (skipping - already judged)")
+        return row
+
+    try:
+        judgment = await judge_response_async(
+            scenario_description=row.description,
+            eval_type=row.eval_type,
+            ground_truth=row.ground_truth,
+            model_response=analysis or row.model_response,
+            judge_prompt_version=judge_prompt_version,
+            use_cache=use_cache,
+            rate_limiter=rate_limiter,
+            max_tokens=max_tokens,
+        )
+    except InvalidResponseError as e:
+        # Left unjudged, so it is counted as such and a resumed run retries it.
+        print(f"[{row.scenario_id}] judge reply rejected: {e}")
+        return row
+
+    if verbose:
+        print(f"[{row.scenario_id}] {row.description[:60]}...")
+        print(f"  -> {judgment.outcome.value}")
+
+    row.model_critique = judgment.critique
+    row.model_outcome = judgment.outcome
+    return row
+
+
+async def run_analysis_async(
+    rows: Iterable[EvalRow],
+    prompt_version: str = "v1",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    verbose: bool = False,
+    use_cache: bool = False,
+    max_tokens: int = ANALYZER_MAX_TOKENS,
+    rate_limiter: AsyncTokenBucket | None = None,
+) -> AsyncIterator[EvalRow]:
+    """
+    Phase 1, concurrently: up to `concurrency` analyzer calls are in flight at once,
+    paced by `rate_limiter` if given.
+
+    Yields rows in input order. Skips rows that already have a model_response.
+    """
+
+    async def analyze(row: EvalRow) -> EvalRow:
+        await _analyze_row(
+            row, prompt_version, verbose, use_cache, max_tokens, rate_limiter
+        )
+        return row
+
+    async for row in _in_input_order(rows, analyze, concurrency):
+        yield row
+
+
+async def run_judge_async(
+    rows: Iterable[EvalRow],
+    judge_prompt_version: str = "v1",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    verbose: bool = False,
+    use_cache: bool = False,
+    max_tokens: int = JUDGE_MAX_TOKENS,
+    rate_limiter: AsyncTokenBucket | None = None,
+) -> AsyncIterator[EvalRow]:
+    """
+    Phase 2, concurrently: up to `concurrency` judge calls are in flight at once,
+    paced by `rate_limiter` if given.
+
+    Yields rows in input order. Skips rows that already have a model_outcome
+    or have no model_response.
+    """
+
+    async def judge(row: EvalRow) -> EvalRow:
+        return await _judge_row(
+            row, judge_prompt_version, verbose, use_cache, max_tokens, rate_limiter
+        )
+
+    async for row in _in_input_order(rows, judge, concurrency):
+        yield row
+
+
+async def run_pipeline_async(
+    rows: Iterable[EvalRow],
+    prompt_version: str = "v1",
+    judge_prompt_version: str = "v1",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    verbose: bool = False,
+    use_cache: bool = False,
+    analyzer_max_tokens: int = ANALYZER_MAX_TOKENS,
+    judge_max_tokens: int = JUDGE_MAX_TOKENS,
+    rate_limiter: AsyncTokenBucket | None = None,
+    skip_analysis: bool = False,
+    skip_judge: bool = False,
+) -> AsyncIterator[EvalRow]:
+    """
+    Phases 1 and 2 fused per row: each row is judged as soon as its own analysis
+    returns, without waiting for the rest of the dataset to be analyzed.
+
+    Up to `concurrency` rows are in flight at once, and each row makes one call
+    at a time, so that also bounds concurrent API calls across both phases.
+    Yields rows in input order, with the same skip rules as the
+    per-phase runners.
+    """
+
+    async def analyze_then_judge(row: EvalRow) -> EvalRow:
+        analysis = None
+        if not skip_analysis:
+            analysis = await _analyze_row(
+                row,
+                prompt_version,
+                verbose,
+                use_cache,
+                analyzer_max_tokens,
+                rate_limiter,
+            )
+        if not skip_judge:
+            row = await _judge_row(
+                row,
+                judge_prompt_version,
+                verbose,
+                use_cache,
+                judge_max_tokens,
+                rate_limiter,
+                analysis,
+            )
+        return row
+
+    async for row in _in_input_order(rows, analyze_then_judge, concurrency):
+        yield row
+
+
+def run_analysis_batch(
+    rows: list[EvalRow],
+    prompt_version: str = "v1",
+    verbose: bool = False,
+    use_cache: bool = False,
+    max_tokens: int = ANALYZER_MAX_TOKENS,
+) -> list[EvalRow]:
+    """
+    Phase 1 via the Message Batches API: all uncached rows go out in one batch.
+
+    Returns rows in input order. Skips rows that already have a model_response;
+    rows whose batch request did not succeed, or whose reply could not be
+    parsed, are returned unchanged.
+    """
+    results: dict[str, AnalysisResult] = {}
+    keys: dict[str, str | None] = {}
+    requests = []
+    for row in rows:
+        if row.model_response:
+            continue
+        request = build_analyzer_request(
+            jsonutil.loads(row.positions_json),
+            jsonutil.loads(row.prices_json),
+            prompt_version,
+            max_tokens,
+        )
+        key, cached = cache.lookup(request, use_cache)
+        if cached is not None:
+            results[row.scenario_id] = AnalysisResult.model_validate_json(cached)
+        else:
+            keys[row.scenario_id] = key
+            requests.append({"custom_id": row.scenario_id, "params": request})
+
+    messages = submit_batch(requests, verbose) if requests else {}
+    for custom_id, message in messages.items():
+        # A bad reply only loses its own row, not the rest of the paid-for batch.
+        try:
+            result = parse_analyzer_response(message)
+        except InvalidResponseError as e:
+            print(f"  [{custom_id}] batch result rejected: {e}")
+            continue
+        cache.store(keys[custom_id], result.model_dump_json())
+        results[custom_id] = result
+
+    for row in rows:
+        result = results.get(row.scenario_id)
+        if row.model_response or result is None:
+            continue
+
+        if verbose:
+            print(f"[{row.scenario_id}] {row.description[:60]}...")
+            print(f"  -> {len(result.suggestions)} suggestions generated")
+
+        row.model_response = result.model_dump_json()
+    return rows
+
+
+def run_judge_batch(
+    rows: list[EvalRow],
+    judge_prompt_version: str = "v1",
+    verbose: bool = False,
+    use_cache: bool = False,
+    max_tokens: int = JUDGE_MAX_TOKENS,
+) -> list[EvalRow]:
+    """
+    Phase 2 via the Message Batches API: all uncached rows go out in one batch.
+
+    Returns rows in input order. Skips rows that already have a model_outcome
+    or have no model_response; rows whose batch request did not succeed, or
+    whose reply could not be parsed, are returned unchanged.
+    """
+    judgments: dict[str, JudgmentResult] = {}
+    keys: dict[str, str | None] = {}
+    requests = []
+    for row in rows:
+        if not row.model_response or row.model_outcome is not None:
+            continue
+        request = build_judge_request(
             scenario_description=row.description,
             eval_type=row.eval_type,
             ground_truth=row.ground_truth,
             model_response=row.model_response,
             judge_prompt_version=judge_prompt_version,
+            max_tokens=max_tokens,
         )
+        key, cached = cache.lookup(request, use_cache)
+        if cached is not None:
+            judgments[row.scenario_id] = JudgmentResult.model_validate_json(cached)
+        else:
+            keys[row.scenario_id] = key
+            requests.append({"custom_id": row.scenario_id, "params": request})
+
+    messages = submit_batch(requests, verbose) if requests else {}
+    for custom_id, message in messages.items():
+        # A bad reply only loses its own row, not the rest of the paid-for batch.
+        try:
+            judgment = parse_judge_response(message)
+        except InvalidResponseError as e:
+            print(f"  [{custom_id}] batch result rejected: {e}")
+            continue
+        cache.store(keys[custom_id], judgment.model_dump_json())
+        judgments[custom_id] = judgment
+
+    for row in rows:
+        judgment = judgments.get(row.scenario_id)
+        if not row.model_response or row.model_outcome is not None or judgment is None:
+            continue
 
         if verbose:
+            print(f"[{row.scenario_id}] {row.description[:60]}...")
             print(f"  -> {judgment.outcome.value}")
 
-        yield row.model_copy(
-            update={
-                "model_critique": judgment.critique,
-                "model_outcome": judgment.outcome,
-            }
-        )
+        row.model_critique = judgment.critique
+        row.model_outcome = judgment.outcome
+    return rows